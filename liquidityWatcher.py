@@ -1,16 +1,28 @@
-﻿import requests
-import time
+﻿import asyncio
 import os
-from datetime import datetime
-from web3 import Web3
+import random
+import time
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any
+import httpx
+import orjson
+from hexbytes import HexBytes
+from eth_abi import encode
+from eth_utils import function_signature_to_4byte_selector
+from web3 import AsyncHTTPProvider, AsyncWeb3, Web3, WebsocketProviderV2
+from web3.contract import AsyncContract
+from web3.types import RPCEndpoint, RPCResponse
 from dotenv import load_dotenv
 
 # Charger les variables d'environnement
 load_dotenv()
 
 # Configuration
-VAULT_ADDRESS = os.getenv("VAULT_ADDRESS")
+VAULT_ADDRESS = os.getenv("VAULT_ADDRESS")  # Une ou plusieurs adresses séparées par des virgules
+VAULT_ADDRESSES = [a.strip() for a in VAULT_ADDRESS.split(",")] if VAULT_ADDRESS else []
 AVALANCHE_RPC = os.getenv("AVALANCHE_RPC", "https://api.avax.network/ext/bc/C/rpc")
+AVALANCHE_WS = os.getenv("AVALANCHE_WS")  # Optionnel : active le mode WebSocket événementiel
 CHECK_INTERVAL = int(os.getenv("CHECK_INTERVAL", "3600"))  # 1 heure en secondes par défaut
 LIQUIDITY_THRESHOLD = float(os.getenv("LIQUIDITY_THRESHOLD", "5000"))  # Seuil de liquidité
 
@@ -18,6 +30,12 @@ LIQUIDITY_THRESHOLD = float(os.getenv("LIQUIDITY_THRESHOLD", "5000"))  # Seuil d
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
+# Nombre maximal de tentatives d'envoi d'une alerte avant abandon
+TELEGRAM_MAX_RETRIES = 5
+
+# Fichier d'état persistant (liquidité précédente et alertes déjà envoyées)
+STATE_FILE = os.getenv("STATE_FILE", ".state.json")
+
 # ABI minimal pour récupérer la liquidité disponible
 VAULT_ABI = [
     {
@@ -68,14 +86,77 @@ ERC20_ABI = [
     }
 ]
 
-def init_web3():
-    """Initialise la connexion Web3 à Avalanche"""
-    w3 = Web3(Web3.HTTPProvider(AVALANCHE_RPC))
-    if not w3.is_connected():
+# Topic de l'événement Transfer(address,address,uint256)
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+# Multicall3 (déployé à la même adresse sur Avalanche C-chain)
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+# Taille maximale d'un lot aggregate3 (limites des fournisseurs RPC)
+MULTICALL_BATCH = 25
+
+# ABI minimal pour agréger plusieurs appels en une seule requête RPC
+MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"name": "target", "type": "address"},
+                    {"name": "allowFailure", "type": "bool"},
+                    {"name": "callData", "type": "bytes"}
+                ],
+                "name": "calls",
+                "type": "tuple[]"
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"name": "success", "type": "bool"},
+                    {"name": "returnData", "type": "bytes"}
+                ],
+                "name": "returnData",
+                "type": "tuple[]"
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function"
+    }
+]
+
+def _json_default(obj: Any) -> Any:
+    """Équivalent du Web3JsonEncoder remplacé : HexBytes et AttributeDict"""
+    if isinstance(obj, HexBytes):
+        return obj.hex()
+    if isinstance(obj, bytes):
+        return "0x" + obj.hex()
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Type non sérialisable en JSON: {type(obj)}")
+
+class ORJSONAsyncHTTPProvider(AsyncHTTPProvider):
+    """AsyncHTTPProvider avec (dé)sérialisation JSON via orjson"""
+
+    def encode_rpc_request(self, method: RPCEndpoint, params: Any) -> bytes:
+        return orjson.dumps({
+            "jsonrpc": "2.0",
+            "method": method,
+            "params": params or [],
+            "id": next(self.request_counter),
+        }, default=_json_default)
+
+    def decode_rpc_response(self, raw_response: bytes) -> RPCResponse:
+        return orjson.loads(raw_response)
+
+async def init_web3() -> AsyncWeb3:
+    """Initialise la connexion Web3 asynchrone à Avalanche"""
+    w3 = AsyncWeb3(ORJSONAsyncHTTPProvider(AVALANCHE_RPC))
+    if not await w3.is_connected():
         raise Exception("Impossible de se connecter au réseau Avalanche")
     return w3
 
-def send_telegram_message(message):
+async def send_telegram_message(client: httpx.AsyncClient, message: str) -> bool:
     """Envoie un message via Telegram"""
     if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
         print("⚠️ Configuration Telegram manquante, message non envoyé")
@@ -90,7 +171,12 @@ def send_telegram_message(message):
     }
 
     try:
-        response = requests.post(url, json=payload, timeout=10)
+        # Sérialiser avec orjson plutôt que le json de la stdlib
+        response = await client.post(
+            url,
+            content=orjson.dumps(payload),
+            headers={"Content-Type": "application/json"}
+        )
         if response.status_code == 200:
             print("✅ Message Telegram envoyé avec succès")
             return True
@@ -101,138 +187,361 @@ def send_telegram_message(message):
         print(f"❌ Erreur lors de l'envoi Telegram: {e}")
         return False
 
-def get_available_liquidity(w3, vault_address):
-    """Récupère la liquidité disponible dans le vault"""
-    try:
-        # Créer le contrat vault
-        vault = w3.eth.contract(address=Web3.to_checksum_address(vault_address), abi=VAULT_ABI)
-
-        # Récupérer l'adresse de l'asset
-        asset_address = vault.functions.asset().call()
-
-        # Créer le contrat de l'asset
-        asset = w3.eth.contract(address=asset_address, abi=ERC20_ABI)
-
-        # Récupérer les informations
-        decimals = asset.functions.decimals().call()
-        symbol = asset.functions.symbol().call()
-
-        # La liquidité disponible = balance de l'asset dans le vault
-        available_liquidity = asset.functions.balanceOf(vault_address).call()
-
-        # Convertir en valeur lisible
-        liquidity_formatted = available_liquidity / (10 ** decimals)
+async def _telegram_worker(client: httpx.AsyncClient, queue: asyncio.Queue,
+                           previous_liquidity: dict, alert_sent: dict,
+                           alert_pending: set) -> None:
+    """Tâche de fond : envoie les alertes et ne confirme qu'après livraison effective"""
+    while True:
+        vault_address, message, attempt = await queue.get()
+
+        if await send_telegram_message(client, message):
+            # Marquer l'alerte seulement une fois la livraison confirmée,
+            # et la persister aussitôt pour qu'un redémarrage ne ré-alerte pas
+            alert_sent[vault_address] = True
+            alert_pending.discard(vault_address)
+            save_state(previous_liquidity, alert_sent)
+            print("📱 Alerte Telegram envoyée !")
+        elif attempt < TELEGRAM_MAX_RETRIES:
+            # Ré-essayer après un backoff exponentiel, sans bloquer la boucle RPC
+            await asyncio.sleep(min(60, 2 ** attempt))
+            queue.put_nowait((vault_address, message, attempt + 1))
+        else:
+            # Abandon : l'alerte sera remise en file au prochain cycle
+            alert_pending.discard(vault_address)
+            print(f"❌ Alerte abandonnée après {TELEGRAM_MAX_RETRIES} tentatives")
+
+        queue.task_done()
+
+async def get_asset_metadata(w3: AsyncWeb3, multicall: AsyncContract, vault_address: str) -> dict:
+    """Récupère une seule fois les métadonnées immuables de l'asset du vault"""
+    # Créer le contrat vault (le contrat Multicall3 est partagé par tous les vaults)
+    vault_checksum = Web3.to_checksum_address(vault_address)
+    vault = w3.eth.contract(address=vault_checksum, abi=VAULT_ABI)
+
+    # Épingler un bloc explicite pour que tous les appels voient le même état
+    block_number = await w3.eth.block_number
+
+    # Récupérer l'adresse de l'asset (nécessaire pour construire les appels suivants)
+    asset_address = await vault.functions.asset().call(block_identifier=block_number)
+
+    # Créer le contrat de l'asset
+    asset = w3.eth.contract(address=asset_address, abi=ERC20_ABI)
+
+    # Regrouper les appels de métadonnées en une seule requête RPC
+    calls = [
+        (asset_address, False, asset.encodeABI(fn_name="decimals")),
+        (asset_address, False, asset.encodeABI(fn_name="symbol")),
+    ]
+    results = await multicall.functions.aggregate3(calls).call(block_identifier=block_number)
+
+    # Pré-calculer le calldata de balanceOf(vault) : sélecteur + argument constants
+    bal_calldata = (
+        function_signature_to_4byte_selector("balanceOf(address)")
+        + encode(["address"], [vault_checksum])
+    )
+
+    return {
+        'asset': asset,
+        'asset_address': asset_address,
+        'vault_checksum': vault_checksum,
+        'bal_calldata': bal_calldata,
+        # uint8 : dernier octet du mot de 32 octets, pas besoin du décodeur ABI
+        'decimals': results[0][1][-1],
+        'symbol': w3.codec.decode(["string"], results[1][1])[0]
+    }
 
-        return {
-            'raw': available_liquidity,
-            'formatted': liquidity_formatted,
-            'symbol': symbol,
-            'decimals': decimals
-        }
+async def get_balance(w3: AsyncWeb3, asset_address: str, bal_calldata: bytes, block_number: int | None = None) -> int:
+    """Récupère la balance de l'asset détenue par le vault via un eth_call brut"""
+    if block_number is None:
+        # Résoudre le tag "latest" une seule fois pour tout le cycle
+        block_number = await w3.eth.block_number
+    raw = await w3.eth.call({"to": asset_address, "data": bal_calldata}, block_number)
+    return int.from_bytes(raw, "big")
+
+async def get_balances(w3: AsyncWeb3, multicall: AsyncContract, metadatas: list[dict]) -> list[int]:
+    """Récupère les balances de tous les vaults, par lots Multicall3"""
+    block_number = await w3.eth.block_number
+
+    # Un seul vault : l'appel direct est moins cher que l'agrégat
+    if len(metadatas) == 1:
+        m = metadatas[0]
+        return [await get_balance(w3, m['asset_address'], m['bal_calldata'], block_number)]
+
+    balances = []
+    for start in range(0, len(metadatas), MULTICALL_BATCH):
+        chunk = metadatas[start:start + MULTICALL_BATCH]
+        calls = [(m['asset_address'], False, m['bal_calldata']) for m in chunk]
+        try:
+            results = await multicall.functions.aggregate3(calls).call(block_identifier=block_number)
+            balances.extend(int.from_bytes(r[1], "big") for r in results)
+        except Exception as e:
+            # Repli : appels directs vault par vault si l'agrégat échoue
+            print(f"⚠️ Multicall en échec ({e}), repli sur des appels directs")
+            for m in chunk:
+                balances.append(await get_balance(w3, m['asset_address'], m['bal_calldata'], block_number))
 
-    except Exception as e:
-        print(f"Erreur lors de la récupération de la liquidité: {e}")
-        return None
+    return balances
 
-def format_number(num):
+@lru_cache(maxsize=128)
+def format_number(num: float) -> str:
     """Formate un nombre avec des espaces pour les milliers"""
     return f"{num:,.2f}".replace(",", " ")
 
-def monitor_liquidity():
+# Cache de l'horodatage formaté : en mode événementiel, plusieurs logs
+# peuvent arriver dans la même seconde et partager la même chaîne
+_last_ts_second = 0
+_last_ts_str = ""
+
+def current_timestamp() -> str:
+    """Horodatage formaté, mis en cache à la seconde près"""
+    global _last_ts_second, _last_ts_str
+    now_s = int(time.time())
+    if now_s != _last_ts_second:
+        _last_ts_second = now_s
+        _last_ts_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now_s))
+    return _last_ts_str
+
+def load_state() -> dict:
+    """Recharge l'état persistant depuis le disque, s'il existe"""
+    try:
+        with open(STATE_FILE, "rb") as f:
+            return orjson.loads(f.read())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_state(previous_liquidity: dict, alert_sent: dict) -> None:
+    """Écrit l'état de façon atomique (fichier temporaire puis os.replace)"""
+    tmp_file = STATE_FILE + ".tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(orjson.dumps({"prev": previous_liquidity, "alert_sent": alert_sent}))
+    os.replace(tmp_file, STATE_FILE)
+
+def process_liquidity(vault_address: str, liquidity: float, symbol: str, alert_tmpl: str,
+                      previous_liquidity: float | None, alert_sent: bool,
+                      alert_pending: set, tg_queue: asyncio.Queue) -> tuple[float, bool]:
+    """Affiche la liquidité et sa variation, puis gère l'alerte de seuil"""
+    timestamp = current_timestamp()
+
+    # Afficher les résultats
+    print(f"[{timestamp}] 📍 {vault_address[:6]}...{vault_address[-4:]}")
+    print(f"💰 Liquidité disponible: {format_number(liquidity)} {symbol}")
+
+    # Calculer la variation si on a une valeur précédente
+    if previous_liquidity is not None:
+        change = liquidity - previous_liquidity
+        change_pct = (change / previous_liquidity * 100) if previous_liquidity != 0 else 0
+
+        if change > 0:
+            print(f"📈 Variation: +{format_number(change)} {symbol} (+{change_pct:.2f}%)")
+        elif change < 0:
+            print(f"📉 Variation: {format_number(change)} {symbol} ({change_pct:.2f}%)")
+        else:
+            print(f"➡️  Variation: Aucune")
+
+    # Vérifier le seuil et envoyer une alerte
+    if liquidity >= LIQUIDITY_THRESHOLD:
+        print(f"🎯 Seuil atteint ! Liquidité: {format_number(liquidity)} {symbol}")
+
+        # Envoyer une alerte seulement si ce n'est ni déjà fait, ni en cours d'envoi
+        if not alert_sent and vault_address not in alert_pending:
+            # Seuls la liquidité et l'horodatage sont dynamiques dans le gabarit
+            message = alert_tmpl.format(liq=format_number(liquidity), ts=timestamp)
+
+            # Déposer l'alerte dans la file, sans attendre Telegram ;
+            # le worker ne posera alert_sent qu'à la confirmation d'envoi
+            alert_pending.add(vault_address)
+            tg_queue.put_nowait((vault_address, message, 1))
+            print("📱 Alerte Telegram mise en file !")
+    else:
+        # Réinitialiser l'alerte si la liquidité repasse sous le seuil
+        if alert_sent:
+            alert_sent = False
+            print("ℹ️ Liquidité repassée sous le seuil")
+
+    print("-" * 60)
+    return liquidity, alert_sent
+
+async def watch_liquidity(metadata: dict, inv_scale: float, alert_tmpl: str,
+                          tg_queue: asyncio.Queue, seed_balance: int,
+                          previous_liquidity: dict, alert_sent: dict,
+                          alert_pending: set) -> None:
+    """Suit les Transfer de l'asset via WebSocket : zéro RPC au repos, alerte immédiate"""
+    address = metadata['vault_checksum']
+    asset_address = metadata['asset_address']
+    symbol = metadata['symbol']
+
+    # Adresse du vault paddée à 32 octets pour les filtres de topics
+    vault_topic = "0x" + address[2:].lower().rjust(64, "0")
+
+    balance = seed_balance
+
+    async with AsyncWeb3.persistent_websocket(WebsocketProviderV2(AVALANCHE_WS)) as w3_ws:
+        # Deux abonnements : transferts entrants et sortants du vault
+        sub_in = await w3_ws.eth.subscribe("logs", {
+            "address": asset_address,
+            "topics": [TRANSFER_TOPIC, None, vault_topic]
+        })
+        sub_out = await w3_ws.eth.subscribe("logs", {
+            "address": asset_address,
+            "topics": [TRANSFER_TOPIC, vault_topic]
+        })
+        print(f"✅ Abonnements WebSocket actifs ({sub_in}, {sub_out})")
+
+        async for payload in w3_ws.ws.process_subscriptions():
+            amount = int.from_bytes(payload["result"]["data"], "big")
+
+            # Maintenir la balance courante à partir des montants transférés
+            if payload["subscription"] == sub_in:
+                balance += amount
+            else:
+                balance -= amount
+
+            previous_liquidity[address], alert_sent[address] = process_liquidity(
+                address, balance * inv_scale, symbol, alert_tmpl,
+                previous_liquidity.get(address), alert_sent.get(address, False),
+                alert_pending, tg_queue
+            )
+            save_state(previous_liquidity, alert_sent)
+
+async def monitor_liquidity() -> None:
     """Surveille la liquidité toutes les heures et envoie des alertes Telegram"""
     print("🚀 Démarrage du bot de surveillance Euler sur Avalanche")
-    print(f"📍 Adresse du vault: {VAULT_ADDRESS}")
+    print(f"📍 Vault(s) surveillé(s): {', '.join(VAULT_ADDRESSES)}")
     print(f"⏰ Vérification toutes les {CHECK_INTERVAL//3600} heure(s)")
-    print(f"🎯 Seuil d'alerte: {format_number(LIQUIDITY_THRESHOLD)}")
+
+    # Formater le seuil une seule fois : la chaîne est constante
+    threshold_str = format_number(LIQUIDITY_THRESHOLD)
+    print(f"🎯 Seuil d'alerte: {threshold_str}")
     print("-" * 60)
 
     # Initialiser Web3
-    w3 = init_web3()
+    w3 = await init_web3()
     print("✅ Connexion établie avec Avalanche")
 
-    # Vérifier la configuration Telegram
-    if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
-        print("✅ Bot Telegram configuré")
-        # Envoyer un message de démarrage
-        send_telegram_message(
-            f"🤖 <b>Bot Euler démarré</b>\n\n"
-            f"📍 Vault: <code>{VAULT_ADDRESS[:6]}...{VAULT_ADDRESS[-4:]}</code>\n"
-            f"🎯 Seuil d'alerte: {format_number(LIQUIDITY_THRESHOLD)}\n"
-            f"⏰ Intervalle: {CHECK_INTERVAL//3600}h"
+    # Contrat Multicall3 construit une seule fois et partagé par tous les appels
+    multicall = w3.eth.contract(address=MULTICALL3_ADDRESS, abi=MULTICALL3_ABI)
+
+    # Résoudre une seule fois les métadonnées immuables de chaque vault (ERC-4626)
+    metadatas = list(await asyncio.gather(
+        *(get_asset_metadata(w3, multicall, address) for address in VAULT_ADDRESSES)
+    ))
+    for m in metadatas:
+        print(f"✅ Asset du vault {m['vault_checksum'][:6]}...: {m['symbol']} ({m['asset_address']})")
+
+    # Pré-calculer les échelles : évite une exponentiation bignum à chaque cycle
+    inv_scales = [1.0 / (10 ** m['decimals']) for m in metadatas]
+
+    # Gabarits d'alerte pré-rendus par vault : les parties constantes
+    # (symbole, seuil, adresse) ne sont assemblées qu'une fois
+    alert_tmpls = {
+        m['vault_checksum']: (
+            "🚨 <b>ALERTE LIQUIDITÉ</b> 🚨\n\n"
+            "💰 Liquidité disponible: <b>{liq} " + m['symbol'] + "</b>\n"
+            "🎯 Seuil: " + threshold_str + " " + m['symbol'] + "\n"
+            "⏰ {ts}\n\n"
+            "📍 Vault: <code>" + m['vault_checksum'] + "</code>"
         )
-    else:
-        print("⚠️ Bot Telegram non configuré - les alertes ne seront pas envoyées")
-
-    print("-" * 60)
-    print()
-
-    previous_liquidity = None
-    alert_sent = False  # Pour éviter de spammer les notifications
+        for m in metadatas
+    }
 
-    while True:
-        try:
-            # Récupérer la liquidité
-            liquidity_data = get_available_liquidity(w3, VAULT_ADDRESS)
-
-            if liquidity_data:
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                liquidity = liquidity_data['formatted']
-                symbol = liquidity_data['symbol']
-
-                # Afficher les résultats
-                print(f"[{timestamp}]")
-                print(f"💰 Liquidité disponible: {format_number(liquidity)} {symbol}")
-
-                # Calculer la variation si on a une valeur précédente
-                if previous_liquidity is not None:
-                    change = liquidity - previous_liquidity
-                    change_pct = (change / previous_liquidity * 100) if previous_liquidity != 0 else 0
-
-                    if change > 0:
-                        print(f"📈 Variation: +{format_number(change)} {symbol} (+{change_pct:.2f}%)")
-                    elif change < 0:
-                        print(f"📉 Variation: {format_number(change)} {symbol} ({change_pct:.2f}%)")
-                    else:
-                        print(f"➡️  Variation: Aucune")
-
-                # Vérifier le seuil et envoyer une alerte
-                if liquidity >= LIQUIDITY_THRESHOLD:
-                    print(f"🎯 Seuil atteint ! Liquidité: {format_number(liquidity)} {symbol}")
-
-                    # Envoyer une alerte seulement si ce n'est pas déjà fait
-                    if not alert_sent:
-                        message = (
-                            f"🚨 <b>ALERTE LIQUIDITÉ</b> 🚨\n\n"
-                            f"💰 Liquidité disponible: <b>{format_number(liquidity)} {symbol}</b>\n"
-                            f"🎯 Seuil: {format_number(LIQUIDITY_THRESHOLD)} {symbol}\n"
-                            f"⏰ {timestamp}\n\n"
-                            f"📍 Vault: <code>{VAULT_ADDRESS}</code>"
-                        )
+    # Client HTTP/2 partagé pour Telegram (réutilisation TLS + compression d'en-têtes)
+    limits = httpx.Limits(max_keepalive_connections=4)
+    async with httpx.AsyncClient(http2=True, timeout=10, limits=limits) as client:
+        # Recharger l'état persistant : pas de ré-alerte ni de variation perdue au redémarrage
+        state = load_state()
+        previous_liquidity = state.get("prev", {})  # Par vault
+        alert_sent = state.get("alert_sent", {})  # Par vault, pour éviter de spammer
+        alert_pending = set()  # Vaults dont l'alerte est en file, pas encore confirmée
+
+        # File d'alertes : l'envoi Telegram ne bloque plus la boucle RPC
+        tg_queue = asyncio.Queue()
+        worker = asyncio.create_task(
+            _telegram_worker(client, tg_queue, previous_liquidity, alert_sent, alert_pending)
+        )
 
-                        if send_telegram_message(message):
-                            alert_sent = True
-                            print("📱 Alerte Telegram envoyée !")
+        # Vérifier la configuration Telegram
+        if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
+            print("✅ Bot Telegram configuré")
+            # Envoyer un message de démarrage
+            await send_telegram_message(
+                client,
+                f"🤖 <b>Bot Euler démarré</b>\n\n"
+                f"📍 Vault(s): <code>{', '.join(a[:6] + '...' + a[-4:] for a in VAULT_ADDRESSES)}</code>\n"
+                f"🎯 Seuil d'alerte: {threshold_str}\n"
+                f"⏰ Intervalle: {CHECK_INTERVAL//3600}h"
+            )
+        else:
+            print("⚠️ Bot Telegram non configuré - les alertes ne seront pas envoyées")
+
+        print("-" * 60)
+        print()
+
+        attempt = 0  # Échecs consécutifs, pour le backoff exponentiel
+
+        while True:
+            try:
+                if AVALANCHE_WS:
+                    # Mode événementiel : une lecture pour amorcer, puis flux de Transfer
+                    seed_balances = await get_balances(w3, multicall, metadatas)
+                    attempt = 0
+
+                    # Un watcher par vault ; le TaskGroup annule les watchers
+                    # survivants dès que l'un échoue, avant la relance globale
+                    async with asyncio.TaskGroup() as watchers:
+                        for i, m in enumerate(metadatas):
+                            watchers.create_task(
+                                watch_liquidity(m, inv_scales[i], alert_tmpls[m['vault_checksum']],
+                                                tg_queue, seed_balances[i],
+                                                previous_liquidity, alert_sent, alert_pending)
+                            )
                 else:
-                    # Réinitialiser l'alerte si la liquidité repasse sous le seuil
-                    if alert_sent:
-                        alert_sent = False
-                        print("ℹ️ Liquidité repassée sous le seuil")
-
-                previous_liquidity = liquidity
-                print("-" * 60)
-
-            # Attendre l'intervalle configuré
-            time.sleep(CHECK_INTERVAL)
+                    # Mode sondage : un seul aller-retour RPC pour tous les vaults
+                    balances = await get_balances(w3, multicall, metadatas)
+                    attempt = 0
+
+                    for i, m in enumerate(metadatas):
+                        address = m['vault_checksum']
+                        previous_liquidity[address], alert_sent[address] = process_liquidity(
+                            address, balances[i] * inv_scales[i], m['symbol'], alert_tmpls[address],
+                            previous_liquidity.get(address), alert_sent.get(address, False),
+                            alert_pending, tg_queue
+                        )
 
-        except KeyboardInterrupt:
-            print("\n\n⛔ Arrêt de la surveillance...")
-            if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
-                send_telegram_message("⛔ <b>Bot Euler arrêté</b>")
-            break
-        except Exception as e:
-            print(f"❌ Erreur: {e}")
-            print("⏳ Nouvelle tentative dans 5 minutes...")
-            time.sleep(300)  # Attendre 5 minutes en cas d'erreur
+                    # Persister l'état après un cycle réussi
+                    save_state(previous_liquidity, alert_sent)
+
+                    # Attendre l'intervalle configuré
+                    await asyncio.sleep(CHECK_INTERVAL)
+
+            except (KeyboardInterrupt, asyncio.CancelledError):
+                print("\n\n⛔ Arrêt de la surveillance...")
+                worker.cancel()
+                if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
+                    await send_telegram_message(client, "⛔ <b>Bot Euler arrêté</b>")
+                break
+            except Exception as e:
+                # Backoff exponentiel avec jitter, plafonné à 5 minutes
+                attempt += 1
+                delay = min(300, 2 ** attempt + random.random())
+                print(f"❌ Erreur: {e}")
+                print(f"⏳ Nouvelle tentative dans {delay:.0f} seconde(s)...")
+                await asyncio.sleep(delay)
+
+                # Après plusieurs échecs consécutifs, reconstruire la connexion
+                # (couvre les reconnexions réseau et la re-résolution DNS)
+                if attempt >= 3:
+                    try:
+                        w3 = await init_web3()
+
+                        # Reconstruire les objets contrats liés à l'ancien provider,
+                        # sinon le chemin multicall continuerait d'utiliser la session morte
+                        multicall = w3.eth.contract(address=MULTICALL3_ADDRESS, abi=MULTICALL3_ABI)
+                        for m in metadatas:
+                            m['asset'] = w3.eth.contract(address=m['asset_address'], abi=ERC20_ABI)
+
+                        print("🔄 Connexion Web3 reconstruite")
+                    except Exception as reconnect_error:
+                        print(f"❌ Reconnexion impossible: {reconnect_error}")
 
 if __name__ == "__main__":
     # Vérifier que l'adresse du vault est configurée
@@ -245,4 +554,7 @@ if __name__ == "__main__":
         print("  TELEGRAM_BOT_TOKEN=votre_token")
         print("  TELEGRAM_CHAT_ID=votre_chat_id")
     else:
-        monitor_liquidity()
\ No newline at end of file
+        try:
+            asyncio.run(monitor_liquidity())
+        except KeyboardInterrupt:
+            pass
\ No newline at end of file